@@ -1,3 +1,6 @@
+import asyncio
+import hashlib
+import json
 import os
 import sys
 
@@ -24,6 +27,11 @@ from pipecatcloud.agent import DailySessionArguments
 from dataclasses import dataclass
 from typing import Dict, Optional
 
+try:
+    import uvloop
+except ImportError:  # uvloop is unavailable on Windows
+    uvloop = None
+
 
 DEFAULT_BOT_NAME = "Rachel"
 DEFAULT_CARTERSIA_ENGLISH_VOICE_ID = "6f84f4b8-58a2-430c-8c79-688dad597532"
@@ -31,35 +39,90 @@ IMPORTANT_RULES = "CRITICAL: Your FIRST response must only greet the caller, giv
 
 DEFAULT_MAIN_PROMPT_TEMPLATE = f"""{IMPORTANT_RULES}
 
-You are {DEFAULT_BOT_NAME}, a friendly and empathetic customer support agent for Customer Solutions.
+You are {DEFAULT_BOT_NAME}, a friendly and empathetic customer support agent for Customer Solutions. Speak in English only.
 
 Your objectives:
 1. Greet the caller warmly, introduce yourself as {DEFAULT_BOT_NAME}, and (if unknown) ask for their name.
-2. After learning the caller's name, address them personally and ask how you can help.
-3. Only request account verification details (reservation number, full name, email) if the caller's request requires access to their account (e.g. refunds, booking changes).
-4. Verify that all three details match our records before performing account-level actions such as refunds.
-5. Use the provided `process_refund` tool to send a confirmation email when a refund is approved.
-6. Maintain a warm, professional and concise tone. Be empathetic and helpful.
-7. Always end the call with a warm goodbye and an invitation to reach out again if needed.
-
-Customer records for verification (use ONLY when necessary):
-- Reservation 'RES12345XYZ' | Name 'John Doe'           | Email 'john.doe@example.com'
-- Reservation 'ABC789DEF'   | Name 'Sarah Johnson'      | Email 'sarah.johnson@gmail.com'
-- Reservation 'XYZ456GHI'   | Name 'Michael Chen'       | Email 'michael.chen@yahoo.com'
-- Reservation 'DEF123JKL'   | Name 'Emily Rodriguez'    | Email 'emily.rodriguez@hotmail.com'
-- Reservation 'GHI789MNO'   | Name 'David Thompson'     | Email 'david.thompson@outlook.com'
-- Reservation 'JKL456PQR'   | Name 'Lisa Wang'          | Email 'lisa.wang@company.com'
-
-Important rules:
-- Speak in English only.
-- Always use the caller's name once known.
-- Do not ask for verification until it is needed.
-- If the user no longer needs assistance, then call `terminate_call` immediately.
+2. Once you know the caller's name, always address them by it and ask how you can help.
+3. Only request account verification details (reservation number, full name, email) when the request requires account access (e.g. refunds, booking changes), and verify all three match our records before any account-level action.
+4. Use the provided `process_refund` tool to send a confirmation email when a refund is approved.
+5. Keep a warm, professional, concise and empathetic tone.
+6. End the call with a warm goodbye and an invitation to reach out again if needed. If the caller no longer needs assistance, call `terminate_call` immediately.
+
+Customer records for verification (reservation | name | email):
+- RES12345XYZ | John Doe | john.doe@example.com
+- ABC789DEF | Sarah Johnson | sarah.johnson@gmail.com
+- XYZ456GHI | Michael Chen | michael.chen@yahoo.com
+- DEF123JKL | Emily Rodriguez | emily.rodriguez@hotmail.com
+- GHI789MNO | David Thompson | david.thompson@outlook.com
+- JKL456PQR | Lisa Wang | lisa.wang@company.com
 """
 
+# Every session shares this one string object.
+DEFAULT_MAIN_PROMPT_TEMPLATE = sys.intern(DEFAULT_MAIN_PROMPT_TEMPLATE)
+
+# The system message is kept byte-identical across sessions and always sent
+# first so OpenAI's automatic prompt caching can reuse the prefix. Anything
+# session specific must be appended after it, never interpolated into it.
+SYSTEM_MESSAGE = {"role": "system", "content": DEFAULT_MAIN_PROMPT_TEMPLATE}
+
+# Tool result returned by `terminate_call` so the bot says goodbye.
+TERMINATE_CALL_ACK = "Say: 'Okay, thank you! Have a great day!'"
+
+# Tools exposed to the LLM. Built once at import and shared by every session.
+TOOLS = [
+    ChatCompletionToolParam(
+        type="function",
+        function={
+            "name": "terminate_call",
+            "description": "Terminate the call",
+        },
+    )
+]
+
+# Canonical serialization of the tool schema, which is part of the cached
+# prompt prefix.
+TOOLS_JSON = json.dumps(TOOLS, sort_keys=True, separators=(",", ":"))
+
+# Digest of the cached prefix (system prompt and tools), computed once. The
+# cache key below therefore changes whenever either part does.
+PREFIX_DIGEST = hashlib.blake2b(
+    (DEFAULT_MAIN_PROMPT_TEMPLATE + TOOLS_JSON).encode(), digest_size=16
+).hexdigest()
+
+# OpenAI has no per-message cache breakpoints; instead requests sharing a
+# prompt_cache_key are routed to the same cache, improving prefix hit rates.
+PROMPT_CACHE_KEY = f"customer-support-agent-{PREFIX_DIGEST}"
+
+# Event loops created from here on use uvloop's faster libuv-based loop.
+if uvloop is not None:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
 load_dotenv(override=True)
 logger.remove()
-logger.add(sys.stderr, level="DEBUG")
+LOG_LEVEL = (os.getenv("LOG_LEVEL") or "DEBUG").upper()
+logger.add(sys.stderr, level=LOG_LEVEL)
+DEBUG_LOGGING = logger.level(LOG_LEVEL).no <= logger.level("DEBUG").no
+
+
+def _require_env(name: str) -> str:
+    """Return the value of a required environment variable or fail at import."""
+    value = os.getenv(name)
+    if not value:
+        raise RuntimeError(f"{name} environment variable not set")
+    return value
+
+
+DAILY_API_URL: str = os.getenv("DAILY_API_URL") or "https://api.daily.co/v1"
+DAILY_API_KEY: str = _require_env("DAILY_API_KEY")
+OPENAI_API_KEY: str = _require_env("OPENAI_API_KEY")
+CARTESIA_API_KEY: str = _require_env("CARTESIA_API_KEY")
+
+# Opt-in, since the observer runs for every transcription frame.
+LOG_TRANSCRIPTS = os.getenv("LOG_TRANSCRIPTS") == "1"
+
+# Pipeline metrics add per-frame bookkeeping; only collect them when asked to.
+ENABLE_METRICS = os.getenv("PIPECAT_METRICS") == "1"
 
 
 # ---------------------------------------------------------------------------
@@ -67,6 +130,16 @@ logger.add(sys.stderr, level="DEBUG")
 # ---------------------------------------------------------------------------
 
 
+# Dial-in fields keyed by their case- and underscore-insensitive spelling, so
+# e.g. "callId" and "call_id" both resolve to "call_id".
+DIALIN_FIELD_ALIASES = {
+    "to": "to",
+    "from": "from",
+    "callid": "call_id",
+    "calldomain": "call_domain",
+}
+
+
 @dataclass
 class DialInConfig:
     """Normalized representation of dial-in related settings returned by Daily.
@@ -95,27 +168,83 @@ def parse_dialin_settings(body: Dict) -> DialInConfig:
 
     raw = body.get("dialin_settings") or {}
 
-    # These keys may come in varying capitalizations.
-    dialed = raw.get("To") or raw.get("to")
-    caller = raw.get("From") or raw.get("from")
+    # These keys may come in varying capitalizations, so map them once. Empty
+    # values are skipped so they never shadow another spelling of the same key.
+    fields = {
+        DIALIN_FIELD_ALIASES.get(key.casefold().replace("_", ""), key): value
+        for key, value in raw.items()
+        if value
+    }
+    dialed = fields.get("to")
+    caller = fields.get("from")
 
     settings: Optional[Dict[str, str]] = None
     if raw:
         settings = {
-            "call_id": raw.get("callId") or raw.get("call_id"),
-            "call_domain": raw.get("callDomain") or raw.get("call_domain"),
+            "call_id": fields.get("call_id"),
+            "call_domain": fields.get("call_domain"),
         }
 
     return DialInConfig(dialed, caller, settings)
 
 
+async def warm_up_llm_connection(llm: OpenAILLMService):
+    """Open a pooled HTTPS connection to OpenAI before the first user turn.
+
+    The OpenAI client connects lazily, so without this the first completion
+    would also pay for DNS resolution and the TLS handshake.
+    """
+    # NOTE: Pipecat does not expose the service's AsyncOpenAI client publicly,
+    # so this relies on the private `_client` attribute. A separate client
+    # would not help, since it has its own connection pool. If a Pipecat
+    # upgrade renames the attribute, the warm-up is skipped (an optimization
+    # only) and says so, rather than failing on every call.
+    client = getattr(llm, "_client", None)
+    if client is None:
+        logger.debug("LLM connection warm-up skipped: OpenAI client not found")
+        return
+    try:
+        await client.models.retrieve(llm.model_name)
+    except Exception as e:
+        logger.warning("Failed to warm up the LLM connection: {}", e)
+
+
 # Function call for the bot to terminate the call.
 async def terminate_call(
     function_name, tool_call_id, args, llm: LLMService, context, result_callback
 ):
     """Function the bot can call to terminate the call."""
-    await llm.queue_frame(EndTaskFrame(), FrameDirection.UPSTREAM)
-    await result_callback("""Say: 'Okay, thank you! Have a great day!'""")
+    await asyncio.gather(
+        llm.queue_frame(EndTaskFrame(), FrameDirection.UPSTREAM),
+        result_callback(TERMINATE_CALL_ACK),
+    )
+
+
+class PipelineCanceller:
+    """Cancels a pipeline task at most once.
+
+    Several Daily events (dial-in error, participant left, call state "left")
+    can request a shutdown at nearly the same time. Routing all of them through
+    a single instance gives the session one deterministic shutdown path.
+    """
+
+    __slots__ = ("_task", "_cancelled")
+
+    def __init__(self, task: PipelineTask):
+        """Initialize the PipelineCanceller.
+
+        Args:
+            task: The PipelineTask to cancel
+        """
+        self._task = task
+        self._cancelled = False
+
+    async def cancel(self):
+        """Cancel the task unless a cancellation was already requested."""
+        if self._cancelled:
+            return
+        self._cancelled = True
+        await self._task.cancel()
 
 
 class DialInHandler:
@@ -125,68 +254,83 @@ class DialInHandler:
     all dial-in related events from the Daily platform.
     """
 
-    def __init__(self, transport, task, context_aggregator):
+    __slots__ = ("transport", "task", "context_aggregator", "canceller")
+
+    def __init__(self, transport, task, context_aggregator, canceller):
         """Initialize the DialInHandler.
 
         Args:
             transport: The Daily transport instance
             task: The PipelineTask instance
             context_aggregator: The context aggregator for the LLM
+            canceller: The PipelineCanceller shared by the session's handlers
         """
         self.transport = transport
         self.task = task
         self.context_aggregator = context_aggregator
+        self.canceller = canceller
         self._register_handlers()
 
     def _register_handlers(self):
         """Register all event handlers related to dial-in functionality."""
+        # These handlers only log at DEBUG level, so skip them entirely when
+        # that level is filtered out.
+        if DEBUG_LOGGING:
+            self.transport.add_event_handler("on_dialin_ready", self.on_dialin_ready)
+            self.transport.add_event_handler("on_dialin_connected", self.on_dialin_connected)
+            self.transport.add_event_handler("on_dialin_stopped", self.on_dialin_stopped)
+
+        self.transport.add_event_handler("on_dialin_error", self.on_dialin_error)
+        self.transport.add_event_handler("on_dialin_warning", self.on_dialin_warning)
+        self.transport.add_event_handler(
+            "on_first_participant_joined", self.on_first_participant_joined
+        )
 
-        @self.transport.event_handler("on_dialin_ready")
-        async def on_dialin_ready(transport, data):
-            """Handler for when the dial-in is ready (SIP addresses registered with the SIP network)."""
-            # Forward SIP status updates to your telephony platform if needed.
-            logger.debug(f"Dial-in ready: {data}")
-
-        @self.transport.event_handler("on_dialin_connected")
-        async def on_dialin_connected(transport, data):
-            """Handler for when a dial-in call is connected."""
-            logger.debug(f"Dial-in connected: {data} and set_bot_ready")
-
-        @self.transport.event_handler("on_dialin_stopped")
-        async def on_dialin_stopped(transport, data):
-            """Handler for when a dial-in call is stopped."""
-            logger.debug(f"Dial-in stopped: {data}")
-
-        @self.transport.event_handler("on_dialin_error")
-        async def on_dialin_error(transport, data):
-            """Handler for dial-in errors."""
-            logger.error(f"Dial-in error: {data}")
-            # The bot should leave the call if there is an error
-            await self.task.cancel()
-
-        @self.transport.event_handler("on_dialin_warning")
-        async def on_dialin_warning(transport, data):
-            """Handler for dial-in warnings."""
-            logger.warning(f"Dial-in warning: {data}")
-
-        @self.transport.event_handler("on_first_participant_joined")
-        async def on_first_participant_joined(transport, participant):
-            """Handler for when the first participant joins the call."""
-            logger.info("First participant joined: {}", participant["id"])
-            
-            # Start recording the call
-            try:
-                await transport.start_recording()
-                logger.info("Recording started successfully")
-            except Exception as e:
-                logger.error("Failed to start recording: {}", e)
-            
-            # Capture the participant's transcription
-            await transport.capture_participant_transcription(participant["id"])
+    async def on_dialin_ready(self, transport, data):
+        """Handler for when the dial-in is ready (SIP addresses registered with the SIP network)."""
+        # Forward SIP status updates to your telephony platform if needed.
+        logger.debug("Dial-in ready: {}", data)
+
+    async def on_dialin_connected(self, transport, data):
+        """Handler for when a dial-in call is connected."""
+        logger.debug("Dial-in connected: {} and set_bot_ready", data)
+
+    async def on_dialin_stopped(self, transport, data):
+        """Handler for when a dial-in call is stopped."""
+        logger.debug("Dial-in stopped: {}", data)
+
+    async def on_dialin_error(self, transport, data):
+        """Handler for dial-in errors."""
+        logger.error("Dial-in error: {}", data)
+        # The bot should leave the call if there is an error
+        await self.canceller.cancel()
+
+    async def on_dialin_warning(self, transport, data):
+        """Handler for dial-in warnings."""
+        logger.warning("Dial-in warning: {}", data)
+
+    async def on_first_participant_joined(self, transport, participant):
+        """Handler for when the first participant joins the call."""
+        logger.info("First participant joined: {}", participant["id"])
+
+        # Start recording the call and capture the participant's
+        # transcription concurrently; they are independent API calls.
+        recording, transcription = await asyncio.gather(
+            transport.start_recording(),
+            transport.capture_participant_transcription(participant["id"]),
+            return_exceptions=True,
+        )
+        if isinstance(recording, Exception):
+            logger.error("Failed to start recording: {}", recording)
+        else:
+            logger.info("Recording started successfully")
+        if isinstance(transcription, Exception):
+            raise transcription
+
+        # For the dial-in case, we want the bot to greet the user.
+        # We can prompt the bot to speak by putting the context into the pipeline.
+        await self.task.queue_frames([self.context_aggregator.user().get_context_frame()])
 
-            # For the dial-in case, we want the bot to greet the user.
-            # We can prompt the bot to speak by putting the context into the pipeline.
-            await self.task.queue_frames([self.context_aggregator.user().get_context_frame()])
 
 async def main(room_url: str, token: str, body: dict):
     """Orchestrates the full life-cycle of a single Voice-AI bot session.
@@ -211,7 +355,7 @@ async def main(room_url: str, token: str, body: dict):
     dialin_config = parse_dialin_settings(body)
 
     logger.debug(
-        "Dial-in settings | To: %s | From: %s | Settings: %s",
+        "Dial-in settings | To: {} | From: {} | Settings: {}",
         dialin_config.dialed_phone_number,
         dialin_config.caller_phone_number,
         dialin_config.dialin_settings,
@@ -222,11 +366,14 @@ async def main(room_url: str, token: str, body: dict):
         token,
         "Voice AI Bot",
         DailyParams(
-            api_url=os.getenv("DAILY_API_URL"),
-            api_key=os.getenv("DAILY_API_KEY"),
+            api_url=DAILY_API_URL,
+            api_key=DAILY_API_KEY,
             dialin_settings=dialin_config.dialin_settings,
             audio_in_enabled=True,
             audio_out_enabled=True,
+            # Write TTS audio in 20ms chunks (default 40ms) so the first packet
+            # of each response reaches the caller sooner.
+            audio_out_10ms_chunks=2,
             video_out_enabled=False,
             vad_analyzer=SileroVADAnalyzer(),
             transcription_enabled=True
@@ -234,34 +381,26 @@ async def main(room_url: str, token: str, body: dict):
     )
 
     # Configure STT, LLM and TTS services
-    llm = OpenAILLMService(api_key=os.getenv("OPENAI_API_KEY"), model="gpt-4o-mini")
+    llm = OpenAILLMService(
+        api_key=OPENAI_API_KEY,
+        model="gpt-4o-mini",
+        params=OpenAILLMService.InputParams(
+            extra={"extra_body": {"prompt_cache_key": PROMPT_CACHE_KEY}}
+        ),
+    )
     tts = CartesiaTTSService(
-        api_key=os.getenv("CARTESIA_API_KEY"),
+        api_key=CARTESIA_API_KEY,
         voice_id=DEFAULT_CARTERSIA_ENGLISH_VOICE_ID,
     )
-    
-    messages = [
-        {
-            "role": "system",
-            "content": DEFAULT_MAIN_PROMPT_TEMPLATE
-        },
-    ]
 
     # Registering the terminate_call function as a tool
     # This is used to terminate the call when the bot is done
     llm.register_function("terminate_call", terminate_call)
-    tools = [
-        ChatCompletionToolParam(
-            type="function",
-            function={
-                "name": "terminate_call",
-                "description": "Terminate the call",
-            },
-        )
-    ]
 
-    # This sets up the LLM context by providing messages and tools
-    context = OpenAILLMContext(messages, tools)
+    # This sets up the LLM context by providing messages and tools. The context
+    # is append-only: the static system message and tools form the cached
+    # prefix and every conversation turn is added after them.
+    context = OpenAILLMContext([dict(SYSTEM_MESSAGE)], list(TOOLS))
     context_aggregator = llm.create_context_aggregator(context)
 
     # Build the core voice-AI pipeline
@@ -282,33 +421,37 @@ async def main(room_url: str, token: str, body: dict):
             allow_interruptions=True,
             audio_in_sample_rate=8000,
             audio_out_sample_rate=8000,
-            enable_metrics=True,
-            enable_usage_metrics=True,
-            observers=[TranscriptionLogObserver()],
+            enable_metrics=ENABLE_METRICS,
+            enable_usage_metrics=ENABLE_METRICS,
+            observers=[TranscriptionLogObserver()] if LOG_TRANSCRIPTS else [],
         ),
     )
 
+    canceller = PipelineCanceller(pipeline_task)
+
     # Initialize handlers dict to keep references
     handlers: Dict[str, DialInHandler] = {}
     if dialin_config.dialin_settings:
-        handlers["dialin"] = DialInHandler(transport, pipeline_task, context_aggregator)
+        handlers["dialin"] = DialInHandler(
+            transport, pipeline_task, context_aggregator, canceller
+        )
 
     # Set up general event handlers
     @transport.event_handler("on_call_state_updated")
     async def on_call_state_updated(transport, state):
-        logger.info(f"on_call_state_updated, state: {state}")
+        logger.info("on_call_state_updated, state: {}", state)
         if state == "left":
-            await pipeline_task.cancel()
+            await canceller.cancel()
 
     @transport.event_handler("on_joined")
     async def on_joined(transport, data):
         session_id = data["meetingSession"]["id"]
         bot_id = data["participants"]["local"]["id"]
-        logger.info(f"Session ID: {session_id}, Bot ID: {bot_id}")
+        logger.info("Session ID: {}, Bot ID: {}", session_id, bot_id)
 
     @transport.event_handler("on_participant_left")
     async def on_participant_left(transport, participant, reason):
-        logger.debug(f"Participant left: {participant}, reason: {reason}")
+        logger.debug("Participant left: {}, reason: {}", participant, reason)
                 # Stop recording the call
         try:
             await transport.stop_recording()
@@ -316,10 +459,16 @@ async def main(room_url: str, token: str, body: dict):
         except Exception as e:
             logger.error("Failed to stop recording: {}", e)
             
-        await pipeline_task.cancel()
+        await canceller.cancel()
+
+    # Warm up the LLM connection while the transport joins the room.
+    warmup = asyncio.create_task(warm_up_llm_connection(llm))
 
     runner = PipelineRunner(handle_sigint=False, force_gc=True)
-    await runner.run(pipeline_task)
+    try:
+        await runner.run(pipeline_task)
+    finally:
+        warmup.cancel()
 
 
 async def bot(args: DailySessionArguments):
@@ -331,11 +480,11 @@ async def bot(args: DailySessionArguments):
         body: The configuration object from the request body can contain dialin_settings, and call_transfer
         session_id: The session ID for logging
     """
-    logger.info(f"Bot process initialized {args.room_url} {args.token}")
+    logger.info("Bot process initialized {} {}", args.room_url, args.token)
 
     try:
         await main(args.room_url, args.token, args.body)
         logger.info("Bot process completed")
     except Exception as e:
-        logger.exception(f"Error in bot process: {str(e)}")
+        logger.exception("Error in bot process: {}", e)
         raise
\ No newline at end of file
@@ -3,20 +3,83 @@ Webhook server to handle webhook coming from Daily, create a Daily room and star
 """
 
 import os
+import sys
 from contextlib import asynccontextmanager
 import time
 import aiohttp
+import orjson
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse
+from loguru import logger
 
 load_dotenv()
 
+# Log from a background thread so request handlers never block on stderr.
+logger.remove()
+logger.add(sys.stderr, level=(os.getenv("LOG_LEVEL") or "DEBUG").upper(), enqueue=True)
+
+# Pipecat API settings are read once; the request URL and headers only depend
+# on them, so they are built here and reused by every webhook.
+PIPECAT_API_KEY = os.getenv("PIPECAT_API_KEY")
+PIPECAT_SERVICE = os.getenv("PIPECAT_SERVICE")
+PIPECAT_START_URL = f"https://api.pipecat.daily.co/v1/public/{PIPECAT_SERVICE}/start"
+PIPECAT_HEADERS = {
+    "Authorization": f"Bearer {PIPECAT_API_KEY}",
+    "Content-Type": "application/json"
+}
+
+# Parts of the Pipecat start payload that are the same for every call.
+PIPECAT_ROOM_PROPERTIES = {"enable_recording": "cloud"}
+PIPECAT_SIP_PROPERTIES = {"sip_mode": "dial-in", "num_endpoints": 1}
+
+
+def build_pipecat_payload(
+    caller_phone: str, to_phone: str, call_id: str, call_domain: str, exp_time: int
+) -> bytes:
+    """Serialize the Pipecat start request body for an incoming call."""
+    return orjson.dumps(
+        {
+            "createDailyRoom": True,
+            "dailyRoomProperties": {
+                **PIPECAT_ROOM_PROPERTIES,
+                "sip": {"display_name": caller_phone, **PIPECAT_SIP_PROPERTIES},
+                "exp": exp_time,
+            },
+            "body": {
+                "dialin_settings": {
+                    "from": caller_phone,
+                    "to": to_phone,
+                    "call_id": call_id,
+                    "call_domain": call_domain,
+                }
+            },
+        }
+    )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Create aiohttp session to be used for API calls
-    app.state.session = aiohttp.ClientSession()
+    # Create aiohttp session to be used for API calls. Keep-alive connections
+    # and cached DNS let webhook bursts reuse warm TLS connections to Pipecat,
+    # while the limits bound resource usage under load.
+    connector = aiohttp.TCPConnector(
+        limit=100,
+        limit_per_host=50,
+        ttl_dns_cache=300,
+        keepalive_timeout=60,
+        enable_cleanup_closed=True,
+    )
+    app.state.session = aiohttp.ClientSession(
+        connector=connector,
+        # Only the TCP/TLS connect is capped tightly. "connect" would also count
+        # the wait for a free pooled connection and fail bursts beyond
+        # limit_per_host. There is no total deadline because /start may be slow
+        # on a cold start, and giving up could abandon a bot that was already
+        # started. sock_read only catches a server that stops responding.
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=2, sock_read=60),
+    )
     yield
     # Close session when shutting down
     await app.state.session.close()
@@ -28,11 +91,11 @@ app = FastAPI(lifespan=lifespan)
 @app.post("/start")
 async def handle_incoming_daily_webhook(request: Request) -> JSONResponse:
     """Handle incoming Daily call webhook."""
-    print("Received webhook from Daily")
+    logger.debug("Received webhook from Daily")
 
     # Get the dial-in properties from the request
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         if "test" in data:
             # Pass through any webhook checks
             return JSONResponse({"test": True})
@@ -48,71 +111,45 @@ async def handle_incoming_daily_webhook(request: Request) -> JSONResponse:
         call_id = str(data.get("callId"))
         call_domain = str(data.get("callDomain"))
         
-        print(f"Processing call from {caller_phone} to {to_phone}")
+        logger.info("Processing call from {} to {}", caller_phone, to_phone)
 
-        # Get environment variables for Pipecat API
-        pipecat_api_key = os.getenv("PIPECAT_API_KEY")
-        pipecat_service = os.getenv("PIPECAT_SERVICE")
-        
-        if not pipecat_api_key:
+        if not PIPECAT_API_KEY:
             raise HTTPException(status_code=500, detail="PIPECAT_API_KEY environment variable not set")
-        if not pipecat_service:
+        if not PIPECAT_SERVICE:
             raise HTTPException(status_code=500, detail="PIPECAT_SERVICE environment variable not set")
 
-        # Calculate expiration time (1 hour from now)
-        exp_time = int(time.time()) + (1 * 60 * 60)
+        # Calculate expiration time (1 hour from now, rounded up to the next
+        # minute so webhooks arriving within the same minute share it)
+        exp_time = (time.time_ns() // 60_000_000_000 + 1) * 60 + (1 * 60 * 60)
 
         # Prepare the payload for Pipecat API
-        pipecat_payload = {
-            "createDailyRoom": True,
-            "dailyRoomProperties": {
-                "enable_recording": "cloud",  
-                "sip": {
-                    "display_name": caller_phone,
-                    "sip_mode": "dial-in",
-                    "num_endpoints": 1
-                },
-                "exp": exp_time
-            },
-            "body": {
-                "dialin_settings": {
-                    "from": caller_phone,
-                    "to": to_phone,
-                    "call_id": call_id,
-                    "call_domain": call_domain
-                }
-            }
-        }
+        pipecat_payload = build_pipecat_payload(
+            caller_phone, to_phone, call_id, call_domain, exp_time
+        )
 
         # Call Pipecat API
-        pipecat_url = f"https://api.pipecat.daily.co/v1/public/{pipecat_service}/start"
-        headers = {
-            "Authorization": f"Bearer {pipecat_api_key}",
-            "Content-Type": "application/json"
-        }
-
         try:
             async with request.app.state.session.post(
-                pipecat_url, 
-                json=pipecat_payload, 
-                headers=headers
+                PIPECAT_START_URL, 
+                data=pipecat_payload, 
+                headers=PIPECAT_HEADERS
             ) as response:
                 if response.status != 200:
                     error_text = await response.text()
-                    print(f"Pipecat API error: {response.status} - {error_text}")
+                    logger.error("Pipecat API error: {} - {}", response.status, error_text)
                     raise HTTPException(
                         status_code=500, 
                         detail=f"Pipecat API error: {response.status} - {error_text}"
                     )
                 
                 pipecat_response = await response.json()
-                print(f"Pipecat API response: {pipecat_response}")
+                logger.debug("Pipecat API response: {}", pipecat_response)
                 
         except aiohttp.ClientError as e:
-            print(f"Error calling Pipecat API: {e}")
+            logger.error("Error calling Pipecat API: {}", e)
             raise HTTPException(status_code=500, detail=f"Failed to call Pipecat API: {str(e)}")
         except Exception as e:
-            print(f"Error calling Pipecat API: {e}")
+            logger.error("Error calling Pipecat API: {}", e)
             raise HTTPException(status_code=500, detail=f"Failed to call Pipecat API: {str(e)}")
 
         # Return just a 200 status
@@ -121,7 +158,7 @@ async def handle_incoming_daily_webhook(request: Request) -> JSONResponse:
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: {}", e)
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 
@@ -132,5 +169,17 @@ async def health_check():
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "7860"))
-    print(f"Starting server on port {port}")
-    uvicorn.run("server:app", host="0.0.0.0", port=port, reload=True)
+    logger.info("Starting server on port {}", port)
+    # Auto-reload is a development aid and cannot be combined with workers.
+    dev = os.getenv("DEV") == "1"
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=port,
+        # "auto" picks uvloop and httptools (from uvicorn[standard]) when
+        # installed and falls back to asyncio/h11 elsewhere, e.g. on Windows.
+        loop="auto",
+        http="auto",
+        workers=None if dev else int(os.getenv("WEB_CONCURRENCY") or "2"),
+        reload=dev,
+    )